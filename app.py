@@ -1,16 +1,23 @@
+import hashlib
 import os
+import random
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import streamlit as st
 
-from core.llm_script import generate_video_plan
+from core.llm_script import generate_video_plan, stream_video_plan
+from core.llm_providers import LLMProviderError
 from core.tts_voice import synthesize_voice
 from core.pika_video import generate_pika_video, PikaError
 from core.video_renderer import (
     merge_video_and_audio,
     build_slideshow_video,
     list_music_tracks,
+    choose_music_track,
+    ENCODER_PROFILE,
 )
+from core import render_cache
 from core.config import OUTPUT_DIR
 
 st.set_page_config(page_title="ViralVid AI", layout="wide")
@@ -24,6 +31,39 @@ st.markdown(
     "- **AI Motion** (Pika via FAL.ai, when you have credits).\n"
 )
 
+
+@st.cache_resource
+def _background_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=2)
+
+
+def _voice_filename(script: str) -> str:
+    # One file per script so overlapping TTS jobs never share an output path
+    digest = hashlib.sha256(script.encode("utf-8")).hexdigest()[:12]
+    return f"voiceover_{digest}.mp3"
+
+
+def _prefetch_voice(script: str) -> None:
+    """Start the voiceover in the background; Create video picks it up."""
+    prefetched = st.session_state.get("voice_prefetch")
+    if prefetched and prefetched[0] == script:
+        return
+    st.session_state["voice_prefetch"] = (
+        script,
+        _background_pool().submit(
+            synthesize_voice, script, filename=_voice_filename(script)
+        ),
+    )
+
+
+def _show_plan(plan) -> None:
+    st.subheader("Generated Script")
+    st.write(plan.full_script)
+    st.subheader("Scene Breakdown")
+    for i, s in enumerate(plan.scenes, start=1):
+        st.markdown(f"**Scene {i} ({s.duration_sec}s)**: {s.text}")
+
+
 tab_generate, tab_videos = st.tabs(["Create Video", "My Videos"])
 
 
@@ -51,28 +91,78 @@ with tab_generate:
         )
     with col3:
         llm_provider = st.selectbox("Script model", ["openai", "gemini"])
+        hedge_llm = st.checkbox(
+            "Hedge slow responses",
+            value=False,
+            help="If the script model is slower than usual, also ask the other model and use whichever answers first. "
+            "The plan is shown once complete instead of streaming in.",
+        )
 
     if st.button("Generate script and plan", type="primary"):
         if not prompt.strip():
             st.error("Please enter a product description.")
         else:
-            with st.spinner("Generating script and shot list..."):
-                plan = generate_video_plan(
-                    prompt=prompt,
-                    brand_tone=tone,
-                    length_sec=desired_length,
-                    provider=llm_provider,
+            plan = None
+            try:
+                if hedge_llm:
+                    with st.spinner("Generating script and shot list..."):
+                        plan = generate_video_plan(
+                            prompt=prompt,
+                            brand_tone=tone,
+                            length_sec=desired_length,
+                            provider=llm_provider,
+                            hedge=True,
+                        )
+                    _show_plan(plan)
+                    _prefetch_voice(plan.full_script)
+                else:
+                    # Render the script and each scene as soon as they stream in
+                    stream_area = st.empty()
+                    streamed = stream_area.container()
+                    recovered = False
+                    with st.spinner("Writing script and shot list..."):
+                        for kind, value in stream_video_plan(
+                            prompt=prompt,
+                            brand_tone=tone,
+                            length_sec=desired_length,
+                            provider=llm_provider,
+                        ):
+                            if kind == "full_script":
+                                streamed.subheader("Generated Script")
+                                streamed.write(value)
+                                streamed.subheader("Scene Breakdown")
+                                # Start the voiceover while scenes are still arriving
+                                _prefetch_voice(value)
+                            elif kind == "scene":
+                                idx, scene = value
+                                streamed.markdown(
+                                    f"**Scene {idx} ({scene.duration_sec}s)**: {scene.text}"
+                                )
+                            elif kind == "fallback":
+                                recovered = True
+                                st.warning(
+                                    "The streamed plan was incomplete or invalid; "
+                                    "regenerating it..."
+                                )
+                            elif kind == "plan":
+                                plan = value
+
+                    if recovered:
+                        # Replace the partial stream with the recovered plan
+                        stream_area.empty()
+                        with stream_area.container():
+                            _show_plan(plan)
+                        _prefetch_voice(plan.full_script)
+            except LLMProviderError as e:
+                st.error(
+                    "Script generation failed.\n\n"
+                    f"Details: {e}\n\n"
+                    "Check your API keys or try again in a moment."
                 )
+                st.stop()
             st.session_state["plan"] = plan
             st.session_state["raw_prompt"] = prompt
 
-            st.subheader("Generated Script")
-            st.write(plan.full_script)
-
-            st.subheader("Scene Breakdown")
-            for i, s in enumerate(plan.scenes, start=1):
-                st.markdown(f"**Scene {i} ({s.duration_sec}s)**: {s.text}")
-
             st.success("Script and plan ready. Scroll down to generate the video.")
 
     if "plan" in st.session_state:
@@ -108,20 +198,29 @@ with tab_generate:
             help="Choose a specific track from assets/music, a random one, or no music.",
         )
 
+        # "Random" is driven by an explicit seed so identical requests can be cached
+        music_seed = None
+        if music_choice == "Random":
+            if "music_seed" not in st.session_state:
+                st.session_state["music_seed"] = random.randrange(1_000_000)
+            music_seed = int(
+                st.number_input(
+                    "Random music seed",
+                    min_value=0,
+                    step=1,
+                    key="music_seed",
+                    help="Same seed, same track. Change it to pick a different random track.",
+                )
+            )
+
         if st.button("Create video", type="secondary"):
             plan = st.session_state["plan"]
             raw_prompt = st.session_state.get("raw_prompt", "")
+            voice_name = "alloy"
+            music_path = choose_music_track(music_choice, music_seed)
 
-            # 1) Voiceover (always)
-            with st.spinner("Generating voiceover..."):
-                voice_path = synthesize_voice(plan.full_script)
-
-            # 2) Depending on engine
             if engine.startswith("AI Motion"):
-                st.info(
-                    "Using AI Motion engine (Pika via FAL.ai). "
-                    "If your FAL account has no credits, this will fail."
-                )
+                output_name = "viralvid_pika_promo.mp4"
 
                 # shorter clips to minimize cost when you eventually use credits
                 pika_duration = 3
@@ -133,34 +232,24 @@ with tab_generate:
                     f"clean background. No text baked into the video, visuals only."
                 )
 
-                try:
-                    with st.spinner("Generating motion video with Pika (fal.ai)..."):
-                        base_video_path = generate_pika_video(
-                            prompt=pika_prompt,
-                            duration=pika_duration,
-                            aspect_ratio="9:16",
-                            resolution="720p",
-                            filename="pika_base_video.mp4",
-                        )
-
-                    with st.spinner("Merging video with voiceover and music..."):
-                        final_path = merge_video_and_audio(
-                            base_video_path,
-                            voice_path,
-                            music_choice=music_choice,
-                            output_name="viralvid_pika_promo.mp4",
-                        )
-
-                except PikaError as e:
-                    st.error(
-                        "AI Motion engine failed.\n\n"
-                        f"Details: {e}\n\n"
-                        "You may have no credits on FAL.ai. "
-                        "Switch to Smart Slideshow or top up your FAL balance."
-                    )
-                    st.stop()
-
+                cache_key = render_cache.render_key(
+                    script=plan.full_script,
+                    voice=voice_name,
+                    engine="pika",
+                    resolution="720p",
+                    encoder=ENCODER_PROFILE,
+                    music_path=music_path,
+                    music_seed=music_seed,
+                    extra={
+                        "prompt": pika_prompt,
+                        "duration": pika_duration,
+                        "aspect_ratio": "9:16",
+                    },
+                )
             else:
+                output_name = "viralvid_slideshow_promo.mp4"
+                target_resolution = 1080
+
                 # Smart Slideshow engine: requires images
                 if not uploaded_images:
                     st.error(
@@ -174,17 +263,88 @@ with tab_generate:
                 for i, f in enumerate(uploaded_images, start=1):
                     p = Path(OUTPUT_DIR) / f"upload_{i}.png"
                     with open(p, "wb") as out:
-                        out.write(f.read())
+                        out.write(f.getvalue())
                     image_paths.append(str(p))
 
-                with st.spinner("Building slideshow video..."):
-                    final_path = build_slideshow_video(
-                        image_paths=image_paths,
-                        voiceover_path=voice_path,
-                        music_choice=music_choice,
-                        output_name="viralvid_slideshow_promo.mp4",
+                cache_key = render_cache.render_key(
+                    script=plan.full_script,
+                    voice=voice_name,
+                    engine="slideshow",
+                    resolution=target_resolution,
+                    encoder=ENCODER_PROFILE,
+                    image_paths=image_paths,
+                    music_path=music_path,
+                    music_seed=music_seed,
+                )
+
+            final_path = render_cache.lookup(cache_key)
+            if final_path:
+                st.info("Identical video already rendered - reusing it.")
+            else:
+                # 1) Voiceover (always) - reuse the one started during streaming
+                voice_path = None
+                prefetched = st.session_state.pop("voice_prefetch", None)
+                with st.spinner("Generating voiceover..."):
+                    if prefetched and prefetched[0] == plan.full_script:
+                        try:
+                            voice_path = prefetched[1].result()
+                        except Exception:
+                            voice_path = None
+                    if not voice_path:
+                        voice_path = synthesize_voice(
+                            plan.full_script,
+                            voice=voice_name,
+                            filename=_voice_filename(plan.full_script),
+                        )
+
+                # 2) Depending on engine
+                if engine.startswith("AI Motion"):
+                    st.info(
+                        "Using AI Motion engine (Pika via FAL.ai). "
+                        "If your FAL account has no credits, this will fail."
                     )
 
+                    try:
+                        with st.spinner("Generating motion video with Pika (fal.ai)..."):
+                            base_video_path = generate_pika_video(
+                                prompt=pika_prompt,
+                                duration=pika_duration,
+                                aspect_ratio="9:16",
+                                resolution="720p",
+                                filename="pika_base_video.mp4",
+                            )
+
+                        with st.spinner("Merging video with voiceover and music..."):
+                            rendered_path = merge_video_and_audio(
+                                base_video_path,
+                                voice_path,
+                                music_choice=music_choice,
+                                output_name=output_name,
+                                music_seed=music_seed,
+                            )
+
+                    except PikaError as e:
+                        st.error(
+                            "AI Motion engine failed.\n\n"
+                            f"Details: {e}\n\n"
+                            "You may have no credits on FAL.ai. "
+                            "Switch to Smart Slideshow or top up your FAL balance."
+                        )
+                        st.stop()
+
+                else:
+                    with st.spinner("Building slideshow video..."):
+                        rendered_path = build_slideshow_video(
+                            image_paths=image_paths,
+                            voiceover_path=voice_path,
+                            music_choice=music_choice,
+                            output_name=output_name,
+                            target_resolution=target_resolution,
+                            music_seed=music_seed,
+                        )
+
+                final_path = render_cache.store(cache_key, rendered_path)
+
             # Show and download
             st.success("Video ready!")
             st.video(final_path)
@@ -193,7 +353,7 @@ with tab_generate:
                 st.download_button(
                     label="Download MP4",
                     data=f.read(),
-                    file_name=Path(final_path).name,
+                    file_name=output_name,
                     mime="video/mp4",
                 )
 
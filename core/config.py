@@ -12,3 +12,10 @@ FAL_KEY = os.getenv("FAL_KEY")
 
 OUTPUT_DIR = os.getenv("OUTPUT_DIR", str(BASE_DIR / "outputs"))
 MUSIC_DIR = os.getenv("MUSIC_DIR", str(BASE_DIR / "assets" / "music"))
+
+RENDER_CACHE_DIR = os.getenv("RENDER_CACHE_DIR", str(Path(OUTPUT_DIR) / "render_cache"))
+RENDER_CACHE_MAX_MB = int(os.getenv("RENDER_CACHE_MAX_MB", "2048"))
+
+# Opt-in render profiling (frame timings, encoder pipe, tracemalloc, leaked readers)
+RENDER_PROFILE = os.getenv("RENDER_PROFILE", "").lower() in ("1", "true", "yes")
+PROFILE_DIR = os.getenv("PROFILE_DIR", str(Path(OUTPUT_DIR) / "profiles"))
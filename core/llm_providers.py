@@ -0,0 +1,331 @@
+import random
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterator, List, TypeVar
+
+from .config import OPENAI_API_KEY, GEMINI_API_KEY
+
+from openai import OpenAI
+import google.generativeai as genai
+
+# Retries and deadlines are owned by complete_with_failover, not the SDK
+client = OpenAI(api_key=OPENAI_API_KEY).with_options(max_retries=0)
+if GEMINI_API_KEY:
+    genai.configure(api_key=GEMINI_API_KEY)
+
+T = TypeVar("T")
+
+
+class LLMProviderError(Exception):
+    """Raised when no provider produced a valid response in time."""
+    pass
+
+
+# ----------------------
+# Providers
+# ----------------------
+
+class LLMProvider:
+    """
+    Base class for a chat model backend. Subclasses implement `complete`,
+    which returns the raw JSON text of the model response, and `stream`,
+    which yields the same text in chunks as the model produces it.
+    """
+
+    name = "base"
+
+    def __init__(self, history: int = 50):
+        self.latencies = deque(maxlen=history)
+
+    def is_available(self) -> bool:
+        return True
+
+    def complete(self, sys_prompt: str, user_prompt: str, timeout: float) -> str:
+        raise NotImplementedError
+
+    def stream(
+        self, sys_prompt: str, user_prompt: str, timeout: float
+    ) -> Iterator[str]:
+        raise NotImplementedError
+
+    def record_latency(self, seconds: float) -> None:
+        self.latencies.append(seconds)
+
+    def p95_latency(self, default: float, min_samples: int = 5) -> float:
+        """
+        95th percentile of recent successful call latencies, or `default`
+        until enough samples have been collected.
+        """
+        if len(self.latencies) < min_samples:
+            return default
+        ordered = sorted(self.latencies)
+        idx = min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))
+        return ordered[idx]
+
+
+class OpenAIProvider(LLMProvider):
+    name = "openai"
+
+    def __init__(self, model: str = "gpt-4.1-mini", **kwargs):
+        super().__init__(**kwargs)
+        self.model = model
+
+    def is_available(self) -> bool:
+        return bool(OPENAI_API_KEY)
+
+    def complete(self, sys_prompt: str, user_prompt: str, timeout: float) -> str:
+        resp = client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": sys_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            response_format={"type": "json_object"},
+            timeout=timeout,
+        )
+        return resp.choices[0].message.content
+
+    def stream(
+        self, sys_prompt: str, user_prompt: str, timeout: float
+    ) -> Iterator[str]:
+        resp = client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": sys_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            response_format={"type": "json_object"},
+            stream=True,
+            timeout=timeout,
+        )
+        for chunk in resp:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def __init__(self, model: str = "gemini-1.5-flash", **kwargs):
+        super().__init__(**kwargs)
+        self.model = model
+
+    def is_available(self) -> bool:
+        return bool(GEMINI_API_KEY)
+
+    def complete(self, sys_prompt: str, user_prompt: str, timeout: float) -> str:
+        model = genai.GenerativeModel(self.model)
+        resp = model.generate_content(
+            [{"role": "user", "parts": [sys_prompt + "\n\n" + user_prompt]}],
+            generation_config={"response_mime_type": "application/json"},
+            request_options={"timeout": timeout},
+        )
+        return resp.candidates[0].content.parts[0].text
+
+    def stream(
+        self, sys_prompt: str, user_prompt: str, timeout: float
+    ) -> Iterator[str]:
+        model = genai.GenerativeModel(self.model)
+        resp = model.generate_content(
+            [{"role": "user", "parts": [sys_prompt + "\n\n" + user_prompt]}],
+            generation_config={"response_mime_type": "application/json"},
+            request_options={"timeout": timeout},
+            stream=True,
+        )
+        for chunk in resp:
+            if chunk.candidates and chunk.candidates[0].content.parts:
+                yield chunk.candidates[0].content.parts[0].text
+
+
+# Shared instances so latency history survives across requests.
+PROVIDERS = {
+    "openai": OpenAIProvider(),
+    "gemini": GeminiProvider(),
+}
+
+
+def provider_chain(preferred: str) -> List[LLMProvider]:
+    """
+    Preferred provider first, then every other configured provider as
+    failover. Falls back to OpenAI if nothing reports a key.
+    """
+    ordered = [PROVIDERS[preferred]] if preferred in PROVIDERS else []
+    ordered += [p for name, p in PROVIDERS.items() if name != preferred]
+    chain = [p for p in ordered if p.is_available()]
+    return chain or [PROVIDERS["openai"]]
+
+
+# ----------------------
+# Hedged / failover execution
+# ----------------------
+
+def _timed_call(
+    provider: LLMProvider,
+    sys_prompt: str,
+    user_prompt: str,
+    timeout: float,
+    parse: Callable[[str], T],
+) -> T:
+    start = time.monotonic()
+    raw = provider.complete(sys_prompt, user_prompt, timeout)
+    result = parse(raw)
+    provider.record_latency(time.monotonic() - start)
+    return result
+
+
+def _attempt(
+    providers: List[LLMProvider],
+    sys_prompt: str,
+    user_prompt: str,
+    parse: Callable[[str], T],
+    timeout: float,
+    hedge: bool,
+    hedge_default: float,
+) -> T:
+    """
+    One pass over the provider chain. The next provider is started as soon
+    as the running one fails, or - when hedging - once the running one has
+    been slower than its own p95 latency. The first valid result wins.
+    """
+    pool = ThreadPoolExecutor(max_workers=len(providers))
+    deadline = time.monotonic() + timeout
+    queue = list(providers)
+    pending = {}
+    errors = []
+
+    def launch():
+        provider = queue.pop(0)
+        remaining = max(0.1, deadline - time.monotonic())
+        fut = pool.submit(
+            _timed_call, provider, sys_prompt, user_prompt, remaining, parse
+        )
+        pending[fut] = provider
+        return provider
+
+    try:
+        hedge_at = None
+        primary = launch()
+        if hedge and queue:
+            hedge_at = time.monotonic() + primary.p95_latency(hedge_default)
+
+        while pending:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            wake = deadline
+            if hedge_at is not None:
+                wake = min(wake, hedge_at)
+
+            done, _ = wait(
+                list(pending), timeout=max(0.0, wake - now),
+                return_when=FIRST_COMPLETED,
+            )
+
+            for fut in done:
+                provider = pending.pop(fut)
+                try:
+                    return fut.result()
+                except Exception as e:
+                    errors.append(f"{provider.name}: {e!r}")
+
+            if hedge_at is not None and time.monotonic() >= hedge_at:
+                hedge_at = None
+                if queue:
+                    print(f"[LLM] Hedging with {queue[0].name}")
+                    launch()
+            elif done and not pending and queue:
+                print(f"[LLM] Failing over to {queue[0].name}")
+                launch()
+    finally:
+        # Never block the caller on a provider that is still hanging.
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    if pending:
+        names = ", ".join(p.name for p in pending.values())
+        errors.append(f"timed out after {timeout:.1f}s waiting on {names}")
+    raise LLMProviderError("; ".join(errors) or "no provider was tried")
+
+
+def complete_with_failover(
+    providers: List[LLMProvider],
+    sys_prompt: str,
+    user_prompt: str,
+    parse: Callable[[str], T],
+    timeout: float = 30.0,
+    retries: int = 2,
+    backoff: float = 1.0,
+    hedge: bool = False,
+    hedge_default: float = 8.0,
+) -> T:
+    """
+    Run a prompt against `providers` and return `parse(response_text)`.
+
+    - `timeout`: deadline in seconds for each attempt across all providers
+    - `parse`: validates the response; raising marks the call as failed
+    - `retries`: extra attempts after the first, with exponential backoff
+    - `hedge`: start the next provider once the current one exceeds its
+      p95 latency (`hedge_default` seconds until enough history exists)
+    """
+    if not providers:
+        raise LLMProviderError("No LLM providers configured.")
+
+    errors = []
+    for attempt in range(retries + 1):
+        try:
+            return _attempt(
+                providers, sys_prompt, user_prompt, parse,
+                timeout, hedge, hedge_default,
+            )
+        except LLMProviderError as e:
+            errors.append(f"attempt {attempt + 1}: {e}")
+            print(f"[LLM] Attempt {attempt + 1} failed: {e}")
+        if attempt < retries:
+            time.sleep(backoff * (2 ** attempt) * random.uniform(0.8, 1.2))
+
+    raise LLMProviderError(" | ".join(errors))
+
+
+def stream_with_failover(
+    providers: List[LLMProvider],
+    sys_prompt: str,
+    user_prompt: str,
+    timeout: float = 30.0,
+) -> Iterator[str]:
+    """
+    Yield response chunks from the first provider that starts streaming.
+
+    A provider that fails before its first chunk is skipped in favour of
+    the next one. Once chunks have been handed to the caller there is no
+    way to take them back, so a later failure (or exceeding `timeout`
+    for the whole stream) raises LLMProviderError.
+    """
+    if not providers:
+        raise LLMProviderError("No LLM providers configured.")
+
+    errors = []
+    for provider in providers:
+        start = time.monotonic()
+        deadline = start + timeout
+        started = False
+        try:
+            for chunk in provider.stream(sys_prompt, user_prompt, timeout):
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"stream exceeded {timeout:.1f}s")
+                started = True
+                yield chunk
+        except Exception as e:
+            if started:
+                raise LLMProviderError(
+                    f"{provider.name} stream broke off: {e!r}"
+                ) from e
+            errors.append(f"{provider.name}: {e!r}")
+            print(f"[LLM] {provider.name} stream failed, trying next: {e!r}")
+            continue
+
+        if started:
+            provider.record_latency(time.monotonic() - start)
+            return
+        errors.append(f"{provider.name}: empty response")
+
+    raise LLMProviderError("; ".join(errors))
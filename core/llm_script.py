@@ -1,15 +1,13 @@
 from dataclasses import dataclass
-from typing import List
+from typing import Iterator, List, Tuple, Union
 import json
 
-from .config import OPENAI_API_KEY, GEMINI_API_KEY
-
-from openai import OpenAI
-import google.generativeai as genai
-
-client = OpenAI(api_key=OPENAI_API_KEY)
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+from .llm_providers import (
+    complete_with_failover,
+    provider_chain,
+    stream_with_failover,
+    LLMProviderError,
+)
 
 
 @dataclass
@@ -24,16 +22,154 @@ class VideoPlan:
     scenes: List[Scene]
 
 
-def generate_video_plan(
-    prompt: str,
-    brand_tone: str = "energetic",
-    length_sec: int = 30,
-    provider: str = "openai",
-) -> VideoPlan:
+def parse_video_plan(data: str) -> VideoPlan:
     """
-    Creates a short promo script plus per-scene breakdown.
+    Parse and validate the model's JSON response.
+    Raises ValueError if it does not match the VideoPlan schema.
     """
+    try:
+        obj = json.loads(data)
+    except (TypeError, json.JSONDecodeError) as e:
+        raise ValueError(f"Response is not valid JSON: {e}") from e
+
+    if not isinstance(obj, dict):
+        raise ValueError("Response must be a JSON object.")
+
+    full_script = obj.get("full_script")
+    if not isinstance(full_script, str) or not full_script.strip():
+        raise ValueError("`full_script` must be a non-empty string.")
+
+    raw_scenes = obj.get("scenes")
+    if not isinstance(raw_scenes, list) or not raw_scenes:
+        raise ValueError("`scenes` must be a non-empty array.")
+
+    scenes = [_parse_scene(s, i) for i, s in enumerate(raw_scenes)]
+    return VideoPlan(full_script=full_script, scenes=scenes)
+
+
+def _parse_scene(s, idx: int) -> Scene:
+    if not isinstance(s, dict):
+        raise ValueError(f"scenes[{idx}] must be an object.")
+
+    text = s.get("text")
+    if not isinstance(text, str) or not text.strip():
+        raise ValueError(f"scenes[{idx}].text must be a non-empty string.")
+
+    try:
+        duration = int(s.get("duration_sec"))
+    except (TypeError, ValueError):
+        raise ValueError(f"scenes[{idx}].duration_sec must be an integer.")
+    if duration <= 0:
+        raise ValueError(f"scenes[{idx}].duration_sec must be positive.")
+
+    return Scene(text=text, duration_sec=duration)
+
+
+class PlanStreamParser:
+    """
+    Incremental parser for a streamed VideoPlan JSON object.
+
+    Feed it text chunks as they arrive; `feed` returns the pieces that are
+    complete so far, as ("full_script", str) and ("scene", (index, Scene))
+    events. `index` is the 1-based position in the `scenes` array, so it
+    matches the final plan even if a malformed scene is skipped. Scenes
+    are held back until `full_script` has been seen, so the script always
+    comes first. The final document is still validated by
+    `parse_video_plan`.
+    """
+
+    def __init__(self):
+        self.buf = ""
+        self._pos = 0
+        self._stack = []
+        self._in_str = False
+        self._escape = False
+        self._str_start = 0
+        self._expect_key = False
+        self._key = None
+        self._scene_start = None
+        self._scene_index = 0
+        self._have_script = False
+        self._held_scenes = []
+
+    def feed(
+        self, chunk: str
+    ) -> List[Tuple[str, Union[str, Tuple[int, Scene]]]]:
+        self.buf += chunk
+        events = []
+
+        while self._pos < len(self.buf):
+            i = self._pos
+            c = self.buf[i]
+            self._pos += 1
+
+            if self._in_str:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_str = False
+                    self._end_string(self.buf[self._str_start:i + 1], events)
+                continue
+
+            if not self._stack and c != "{":
+                continue  # ignore anything before the root object
+
+            if c == '"':
+                self._in_str = True
+                self._str_start = i
+            elif c in "{[":
+                if self._in_scenes_array():
+                    self._scene_start = i
+                self._stack.append(c)
+                if len(self._stack) == 1:
+                    self._expect_key = True
+            elif c in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if self._in_scenes_array() and self._scene_start is not None:
+                    self._end_scene(self.buf[self._scene_start:i + 1], events)
+                    self._scene_start = None
+            elif c == "," and len(self._stack) == 1:
+                self._expect_key = True
+
+        return events
+
+    def _in_scenes_array(self) -> bool:
+        return (
+            len(self._stack) == 2
+            and self._stack[-1] == "["
+            and self._key == "scenes"
+        )
+
+    def _end_string(self, token: str, events: list) -> None:
+        if len(self._stack) != 1:
+            return
+        if self._expect_key:
+            self._key = json.loads(token)
+            self._expect_key = False
+        elif self._key == "full_script" and not self._have_script:
+            self._have_script = True
+            events.append(("full_script", json.loads(token)))
+            events.extend(self._held_scenes)
+            self._held_scenes = []
+
+    def _end_scene(self, token: str, events: list) -> None:
+        self._scene_index += 1
+        try:
+            scene = _parse_scene(json.loads(token), self._scene_index - 1)
+        except ValueError:
+            return  # reported by parse_video_plan on the full document
+
+        event = ("scene", (self._scene_index, scene))
+        if self._have_script:
+            events.append(event)
+        else:
+            self._held_scenes.append(event)
 
+
+def _build_prompts(prompt: str, brand_tone: str, length_sec: int):
     target_scenes = max(3, min(8, length_sec // 5))
 
     sys_prompt = (
@@ -41,6 +177,7 @@ def generate_video_plan(
         "Output a JSON object with: "
         "`full_script` (full voiceover text) and `scenes` "
         "(array of {text, duration_sec}). "
+        "Write `full_script` before `scenes`. "
         f"Total duration approx {length_sec} seconds and {target_scenes} scenes."
     )
     user_prompt = (
@@ -49,30 +186,76 @@ def generate_video_plan(
         "Audience: TikTok / Reels viewers.\n"
         "Include call to action at the end."
     )
+    return sys_prompt, user_prompt
 
-    if provider == "gemini" and GEMINI_API_KEY:
-        model = genai.GenerativeModel("gemini-1.5-flash")
-        resp = model.generate_content(
-            [{"role": "user", "parts": [sys_prompt + "\n\n" + user_prompt]}],
-            generation_config={"response_mime_type": "application/json"},
-        )
-        data = resp.candidates[0].content.parts[0].text
-    else:
-        resp = client.chat.completions.create(
-            model="gpt-4.1-mini",
-            messages=[
-                {"role": "system", "content": sys_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            response_format={"type": "json_object"},
-        )
-        data = resp.choices[0].message.content
 
-    obj = json.loads(data)
+def generate_video_plan(
+    prompt: str,
+    brand_tone: str = "energetic",
+    length_sec: int = 30,
+    provider: str = "openai",
+    timeout: float = 30.0,
+    retries: int = 2,
+    hedge: bool = False,
+) -> VideoPlan:
+    """
+    Creates a short promo script plus per-scene breakdown.
 
-    scenes = [
-        Scene(text=s["text"], duration_sec=int(s["duration_sec"]))
-        for s in obj["scenes"]
-    ]
+    `provider` is tried first; other configured providers are used as
+    failover (or started early when `hedge` is on). Raises
+    LLMProviderError if no valid plan arrives.
+    """
+
+    sys_prompt, user_prompt = _build_prompts(prompt, brand_tone, length_sec)
+
+    return complete_with_failover(
+        provider_chain(provider),
+        sys_prompt,
+        user_prompt,
+        parse_video_plan,
+        timeout=timeout,
+        retries=retries,
+        hedge=hedge,
+    )
+
+
+def stream_video_plan(
+    prompt: str,
+    brand_tone: str = "energetic",
+    length_sec: int = 30,
+    provider: str = "openai",
+    timeout: float = 60.0,
+) -> Iterator[Tuple[str, Union[str, Tuple[int, Scene], VideoPlan]]]:
+    """
+    Streaming variant of generate_video_plan.
+
+    Yields ("full_script", str) as soon as the script is complete, then
+    ("scene", (index, Scene)) for each scene as it finishes, and finally
+    ("plan", VideoPlan) once the whole response has been validated.
+
+    If the stream breaks or the streamed plan is invalid, yields
+    ("fallback", reason) and recovers through generate_video_plan, with
+    its failover and retries, before yielding the recovered plan. Raises
+    LLMProviderError only if that fails too.
+    """
+    sys_prompt, user_prompt = _build_prompts(prompt, brand_tone, length_sec)
+    parser = PlanStreamParser()
+
+    try:
+        for chunk in stream_with_failover(
+            provider_chain(provider), sys_prompt, user_prompt, timeout=timeout
+        ):
+            yield from parser.feed(chunk)
+        plan = parse_video_plan(parser.buf)
+    except (LLMProviderError, ValueError) as e:
+        reason = f"Streamed plan failed: {e}"
+        print(f"[LLM] {reason}; retrying without streaming")
+        yield ("fallback", reason)
+        plan = generate_video_plan(
+            prompt=prompt,
+            brand_tone=brand_tone,
+            length_sec=length_sec,
+            provider=provider,
+        )
 
-    return VideoPlan(full_script=obj["full_script"], scenes=scenes)
+    yield ("plan", plan)
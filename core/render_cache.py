@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+from .config import RENDER_CACHE_DIR, RENDER_CACHE_MAX_MB
+
+# Bump when the render pipeline changes in a way that alters output.
+CACHE_VERSION = 1
+
+
+def _file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def render_key(
+    script: str,
+    voice: str,
+    engine: str,
+    resolution: Any,
+    encoder: Dict[str, Any],
+    image_paths: Iterable[str] = (),
+    music_path: str = "",
+    music_seed: Optional[int] = None,
+    extra: Optional[Dict[str, Any]] = None,
+) -> str:
+    """
+    Content hash of every input that affects the rendered MP4.
+
+    Images and the music track are hashed by their bytes (upload filenames
+    are reused between runs). The seed used to pick the track is included
+    too when the choice was "Random".
+    """
+    music = _file_digest(music_path) if music_path else None
+
+    payload = {
+        "version": CACHE_VERSION,
+        "script": script,
+        "voice": voice,
+        "engine": engine,
+        "resolution": resolution,
+        "encoder": encoder,
+        "images": [_file_digest(p) for p in image_paths],
+        "music": music,
+        "music_seed": music_seed,
+        "extra": extra or {},
+    }
+    blob = json.dumps(payload, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()
+
+
+def _entry_path(key: str) -> Path:
+    return Path(RENDER_CACHE_DIR) / f"{key}.mp4"
+
+
+def lookup(key: str) -> Optional[str]:
+    """
+    Return the cached MP4 for `key`, or None. A hit refreshes the entry's
+    mtime so eviction is least-recently-used.
+    """
+    path = _entry_path(key)
+    if not path.is_file():
+        return None
+    os.utime(path)
+    return str(path)
+
+
+def store(key: str, video_path: str) -> str:
+    """
+    Copy a freshly rendered MP4 into the cache and evict old entries.
+    Returns the cached path.
+    """
+    os.makedirs(RENDER_CACHE_DIR, exist_ok=True)
+    path = _entry_path(key)
+    tmp = path.with_suffix(".tmp")
+    shutil.copyfile(video_path, tmp)
+    os.replace(tmp, path)
+    evict(keep=path)
+    return str(path)
+
+
+def evict(max_mb: int = RENDER_CACHE_MAX_MB, keep: Optional[Path] = None) -> None:
+    """
+    Delete least-recently-used entries until the cache fits in `max_mb`.
+    `keep` is never evicted, even if it alone exceeds the budget.
+    """
+    cache_dir = Path(RENDER_CACHE_DIR)
+    if not cache_dir.exists():
+        return
+
+    entries = []
+    for p in cache_dir.glob("*.mp4"):
+        try:
+            info = p.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((info.st_mtime, info.st_size, p))
+
+    budget = max_mb * 1024 * 1024
+    total = sum(size for _, size, _ in entries)
+    for _, size, p in sorted(entries, key=lambda e: e[0]):
+        if total <= budget:
+            break
+        if keep is not None and p == keep:
+            continue
+        try:
+            p.unlink()
+        except FileNotFoundError:
+            pass
+        total -= size
@@ -0,0 +1,316 @@
+import json
+import linecache
+import os
+import threading
+import time
+import traceback
+import tracemalloc
+import weakref
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from moviepy.video.io.ffmpeg_reader import FFMPEG_VideoReader
+from moviepy.video.io.ffmpeg_writer import FFMPEG_VideoWriter
+from moviepy.audio.io.readers import FFMPEG_AudioReader
+
+from .config import PROFILE_DIR
+
+# Upper bounds (ms) of the frame time histogram buckets; the last is open-ended
+HISTOGRAM_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+
+
+# Keep the profiler's own bookkeeping out of the allocation report
+_TRACE_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, linecache.__file__),
+    tracemalloc.Filter(False, traceback.__file__),
+    tracemalloc.Filter(False, __file__),
+]
+
+
+def _snapshot():
+    return tracemalloc.take_snapshot().filter_traces(_TRACE_FILTERS)
+
+
+# ----------------------
+# Shared MoviePy hooks
+# ----------------------
+#
+# The writer/reader hooks and tracemalloc are process-wide, while renders
+# from concurrent Streamlit sessions can overlap. The first active profiler
+# installs the hooks and starts tracemalloc (if nobody else did); the last
+# one out removes them. Hook calls are attributed to the profiler running
+# on the current thread, since MoviePy opens readers and writes frames on
+# the thread that called write_videofile.
+
+_HOOK_LOCK = threading.Lock()
+_ACTIVE: List["RenderProfiler"] = []
+_ORIGINALS = []
+_hooks_started_tracemalloc = False
+
+
+def _current_profilers() -> List["RenderProfiler"]:
+    ident = threading.get_ident()
+    with _HOOK_LOCK:
+        return [p for p in _ACTIVE if p._thread == ident]
+
+
+def _timed_write_frame(original):
+    def timed_write_frame(writer, img_array):
+        start = time.perf_counter()
+        try:
+            return original(writer, img_array)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000.0
+            for prof in _current_profilers():
+                prof._write_ms.append(elapsed_ms)
+
+    return timed_write_frame
+
+
+def _tracked_init(original, kind: str):
+    def tracked_init(reader, filename, *args, **kwargs):
+        original(reader, filename, *args, **kwargs)
+        profilers = _current_profilers()
+        if not profilers:
+            return
+        entry = {
+            "ref": weakref.ref(reader),
+            "kind": kind,
+            "filename": str(filename),
+            "opened_at": "".join(traceback.format_stack(limit=8)[:-1]),
+        }
+        for prof in profilers:
+            prof._readers.append(entry)
+
+    return tracked_init
+
+
+def _register(prof: "RenderProfiler") -> None:
+    global _hooks_started_tracemalloc
+    with _HOOK_LOCK:
+        if not _ACTIVE:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(10)
+                _hooks_started_tracemalloc = True
+            tracemalloc.reset_peak()
+
+            hooks = [
+                (FFMPEG_VideoWriter, "write_frame", _timed_write_frame),
+                (FFMPEG_VideoReader, "__init__", lambda f: _tracked_init(f, "video")),
+                (FFMPEG_AudioReader, "__init__", lambda f: _tracked_init(f, "audio")),
+            ]
+            for cls, name, make_hook in hooks:
+                original = getattr(cls, name)
+                _ORIGINALS.append((cls, name, original))
+                setattr(cls, name, make_hook(original))
+        _ACTIVE.append(prof)
+
+
+def _unregister(prof: "RenderProfiler") -> None:
+    global _hooks_started_tracemalloc
+    with _HOOK_LOCK:
+        if prof in _ACTIVE:
+            _ACTIVE.remove(prof)
+        if _ACTIVE:
+            return
+        while _ORIGINALS:
+            cls, name, original = _ORIGINALS.pop()
+            setattr(cls, name, original)
+        if _hooks_started_tracemalloc:
+            tracemalloc.stop()
+            _hooks_started_tracemalloc = False
+
+
+def _histogram(samples_ms: List[float]) -> Dict[str, int]:
+    counts = {f"<={b}ms": 0 for b in HISTOGRAM_BUCKETS_MS}
+    counts[f">{HISTOGRAM_BUCKETS_MS[-1]}ms"] = 0
+    for ms in samples_ms:
+        for b in HISTOGRAM_BUCKETS_MS:
+            if ms <= b:
+                counts[f"<={b}ms"] += 1
+                break
+        else:
+            counts[f">{HISTOGRAM_BUCKETS_MS[-1]}ms"] += 1
+    return counts
+
+
+def _summary(samples_ms: List[float]) -> Dict[str, float]:
+    if not samples_ms:
+        return {"count": 0, "total_ms": 0.0}
+    ordered = sorted(samples_ms)
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 3)
+
+    return {
+        "count": len(ordered),
+        "total_ms": round(sum(ordered), 3),
+        "mean_ms": round(sum(ordered) / len(ordered), 3),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+class RenderProfiler:
+    """
+    Opt-in profiler for one MoviePy render, used as a context manager.
+
+    While active it:
+      - times every top-level frame produced by clips passed to `wrap_clip`
+      - times FFMPEG_VideoWriter.write_frame, i.e. time blocked on the
+        ffmpeg stdin pipe
+      - traces allocations with tracemalloc
+      - records every ffmpeg video/audio reader that is opened, and on exit
+        reports the ones whose ffmpeg process was never closed
+
+    On exit a JSON report is written to PROFILE_DIR. When `enabled` is
+    False every method is a no-op. Overlapping profilers are safe: hooks
+    are shared and samples go to the profiler on the calling thread. Any
+    profiler failure is logged and never fails the render itself. The
+    tracemalloc peak is process-wide, so it includes overlapping renders.
+    """
+
+    def __init__(self, label: str, enabled: bool = True, top_allocations: int = 15):
+        self.label = label
+        self.enabled = enabled
+        self.top_allocations = top_allocations
+        self.report_path: Optional[str] = None
+
+        self._frame_ms: List[float] = []
+        self._write_ms: List[float] = []
+        self._readers = []
+        self._thread = None
+        self._snapshot_start = None
+        self._t_start = 0.0
+
+    # ----------------------
+    # Context manager
+    # ----------------------
+
+    def __enter__(self) -> "RenderProfiler":
+        if not self.enabled:
+            return self
+
+        try:
+            self._thread = threading.get_ident()
+            self._t_start = time.perf_counter()
+            _register(self)
+            self._snapshot_start = _snapshot()
+        except Exception as e:
+            print(f"[Profile] Could not start profiling, continuing without it: {e!r}")
+            _unregister(self)
+            self.enabled = False
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if not self.enabled:
+            return False
+
+        try:
+            wall = time.perf_counter() - self._t_start
+            snapshot_end = _snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            report = self._build_report(wall, snapshot_end, current, peak, exc)
+            self.report_path = self._write_report(report)
+            print(f"[Profile] Report written to {self.report_path}")
+        except Exception as e:
+            print(f"[Profile] Failed to write profile report: {e!r}")
+        finally:
+            _unregister(self)
+        return False
+
+    # ----------------------
+    # Hooks
+    # ----------------------
+
+    def wrap_clip(self, clip):
+        """Time each call to the clip's frame function (in place)."""
+        if not self.enabled:
+            return clip
+
+        make_frame = clip.make_frame
+        samples = self._frame_ms
+
+        def timed_make_frame(t):
+            start = time.perf_counter()
+            frame = make_frame(t)
+            samples.append((time.perf_counter() - start) * 1000.0)
+            return frame
+
+        clip.make_frame = timed_make_frame
+        return clip
+
+    # ----------------------
+    # Report
+    # ----------------------
+
+    def _leaked_readers(self) -> List[dict]:
+        leaked = []
+        for entry in self._readers:
+            reader = entry["ref"]()
+            # Both reader types set `proc` to None once closed
+            if reader is not None and getattr(reader, "proc", None) is not None:
+                leaked.append({
+                    "kind": entry["kind"],
+                    "filename": entry["filename"],
+                    "opened_at": entry["opened_at"],
+                })
+        return leaked
+
+    def _build_report(self, wall, snapshot_end, current, peak, exc) -> dict:
+        frame_total = sum(self._frame_ms) / 1000.0
+        write_total = sum(self._write_ms) / 1000.0
+
+        allocations = []
+        diff = snapshot_end.compare_to(self._snapshot_start, "lineno")
+        for stat in diff[: self.top_allocations]:
+            frame = stat.traceback[0]
+            allocations.append({
+                "location": f"{frame.filename}:{frame.lineno}",
+                "size_diff_kb": round(stat.size_diff / 1024, 1),
+                "count_diff": stat.count_diff,
+                "live_blocks": stat.count,
+            })
+
+        return {
+            "label": self.label,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "status": "error" if exc else "ok",
+            "error": repr(exc) if exc else None,
+            "wall_time_s": round(wall, 3),
+            "frames": {
+                "summary": _summary(self._frame_ms),
+                "histogram": _histogram(self._frame_ms),
+            },
+            "encoder_pipe": {
+                "summary": _summary(self._write_ms),
+                "histogram": _histogram(self._write_ms),
+            },
+            "time_split_s": {
+                "python_frame_production": round(frame_total, 3),
+                "blocked_on_encoder_pipe": round(write_total, 3),
+                "other": round(max(0.0, wall - frame_total - write_total), 3),
+            },
+            "memory": {
+                "traced_current_mb": round(current / (1024 * 1024), 2),
+                "traced_peak_mb": round(peak / (1024 * 1024), 2),
+                "live_blocks": sum(s.count for s in snapshot_end.statistics("filename")),
+                "top_allocations": allocations,
+            },
+            "readers": {
+                "opened": len(self._readers),
+                "leaked": self._leaked_readers(),
+            },
+        }
+
+    def _write_report(self, report: dict) -> str:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        out_path = Path(PROFILE_DIR) / f"{Path(self.label).stem}-{stamp}.profile.json"
+        with open(out_path, "w") as f:
+            json.dump(report, f, indent=2)
+        return str(out_path)
@@ -15,12 +15,20 @@ from moviepy.editor import (
 
 from PIL import Image as PILImage
 
-from .config import OUTPUT_DIR, MUSIC_DIR
+from .config import OUTPUT_DIR, MUSIC_DIR, RENDER_PROFILE
+from .render_profiler import RenderProfiler
 
 # Pillow 10+ compatibility for MoviePy 1.x
 if not hasattr(PILImage, "ANTIALIAS"):
     PILImage.ANTIALIAS = PILImage.LANCZOS
 
+# Encoder settings shared by every engine (also part of the render cache key)
+ENCODER_PROFILE = {
+    "codec": "libx264",
+    "audio_codec": "aac",
+    "fps": 24,
+}
+
 
 # ----------------------
 # Music helpers
@@ -43,11 +51,11 @@ def list_music_tracks() -> List[Path]:
     return sorted(tracks, key=lambda p: p.name.lower())
 
 
-def _choose_music_path(choice: Optional[str]) -> str:
+def choose_music_track(choice: Optional[str], seed: Optional[int] = None) -> str:
     """
     choice:
       - None or "No music" => no music
-      - "Random"           => random track
+      - "Random"           => random track (deterministic when seed is set)
       - "<filename>.mp3"   => specific track by name
     """
     tracks = list_music_tracks()
@@ -55,7 +63,8 @@ def _choose_music_path(choice: Optional[str]) -> str:
         return ""
 
     if choice == "Random":
-        return str(random.choice(tracks))
+        rng = random.Random(seed) if seed is not None else random
+        return str(rng.choice(tracks))
 
     for t in tracks:
         if t.name == choice:
@@ -68,6 +77,7 @@ def _compose_audio(
     voiceover_path: str,
     music_choice: Optional[str],
     target_duration: Optional[float] = None,
+    music_seed: Optional[int] = None,
 ) -> CompositeAudioClip:
     """
     Create a CompositeAudioClip from voiceover + optional background music.
@@ -76,7 +86,7 @@ def _compose_audio(
     voice = AudioFileClip(voiceover_path)
     duration = target_duration or voice.duration
 
-    bg_path = _choose_music_path(music_choice)
+    bg_path = choose_music_track(music_choice, music_seed)
     voice_clip = voice.volumex(1.0)  # main focus
 
     if bg_path:
@@ -89,50 +99,6 @@ def _compose_audio(
     return audio
 
 
-def _choose_music_path(choice: Optional[str]) -> str:
-    """
-    choice:
-      - None or "No music" => no music
-      - "Random"           => random track
-      - "<filename>.mp3"   => specific track by name
-    """
-    tracks = list_music_tracks()
-    if not tracks or choice in (None, "No music"):
-        return ""
-
-    if choice == "Random":
-        return str(random.choice(tracks))
-
-    for t in tracks:
-        if t.name == choice:
-            return str(t)
-
-    return ""
-
-def _compose_audio(
-    voiceover_path: str,
-    music_choice: Optional[str],
-    target_duration: Optional[float] = None,
-) -> CompositeAudioClip:
-    """
-    Create a CompositeAudioClip from voiceover + optional background music.
-    Music is kept low so the voice is always clear.
-    """
-    voice = AudioFileClip(voiceover_path)
-    duration = target_duration or voice.duration
-
-    bg_path = _choose_music_path(music_choice)
-    voice_clip = voice.volumex(1.0)  # main focus
-
-    if bg_path:
-        bg = AudioFileClip(bg_path).volumex(0.12).set_duration(duration)
-        audio = CompositeAudioClip([voice_clip, bg])
-    else:
-        audio = CompositeAudioClip([voice_clip])
-
-    audio = audio.set_duration(duration)
-    return audio
-
 # ----------------------
 # AI Motion (Pika) mixer
 # ----------------------
@@ -142,42 +108,43 @@ def merge_video_and_audio(
     voiceover_path: str,
     music_choice: Optional[str] = "Random",
     output_name: str = "viralvid_pika_promo.mp4",
+    music_seed: Optional[int] = None,
+    profile: bool = RENDER_PROFILE,
 ) -> str:
 
     os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-    video = VideoFileClip(base_video_path)
-    voice = AudioFileClip(voiceover_path)
+    with RenderProfiler(output_name, enabled=profile) as profiler:
+        video = VideoFileClip(base_video_path)
+        voice = AudioFileClip(voiceover_path)
 
-    target_duration = voice.duration or video.duration
+        target_duration = voice.duration or video.duration
 
-    # Create loop manually
-    loops = max(1, math.ceil(target_duration / video.duration))
-    video_loop = concatenate_videoclips([video] * loops)
+        # Create loop manually
+        loops = max(1, math.ceil(target_duration / video.duration))
+        video_loop = concatenate_videoclips([video] * loops)
 
-    # MoviePy v2: trim to exact duration
-    video_loop = video_loop.time_slice(0, target_duration)
+        # MoviePy v2: trim to exact duration
+        video_loop = video_loop.time_slice(0, target_duration)
 
-    # Audio
-    audio = _compose_audio(voiceover_path, music_choice, target_duration)
+        # Audio
+        audio = _compose_audio(
+            voiceover_path, music_choice, target_duration, music_seed
+        )
 
-    # MoviePy v2: replace set_audio()
-    final_clip = video.set_audio(audio)
+        # MoviePy v2: replace set_audio()
+        final_clip = video.set_audio(audio)
 
-    # Set frames per second explicitly
-    final_clip = final_clip.set_fps(24)
+        # Set frames per second explicitly
+        final_clip = final_clip.set_fps(ENCODER_PROFILE["fps"])
 
-    out_path = Path(OUTPUT_DIR) / output_name
-    final_clip.write_videofile(
-        str(out_path),
-        codec="libx264",
-        audio_codec="aac",
-        fps=24,
-    )
+        out_path = Path(OUTPUT_DIR) / output_name
+        profiler.wrap_clip(final_clip)
+        final_clip.write_videofile(str(out_path), **ENCODER_PROFILE)
 
-    video.close()
-    video_loop.close()
-    voice.close()
+        video.close()
+        video_loop.close()
+        voice.close()
 
     return str(out_path)
 
@@ -192,6 +159,8 @@ def build_slideshow_video(
     music_choice: Optional[str] = "Random",
     output_name: str = "viralvid_slideshow_promo.mp4",
     target_resolution: int = 1080,  # vertical height
+    music_seed: Optional[int] = None,
+    profile: bool = RENDER_PROFILE,
 ) -> str:
     """
     Build a Ken-Burns-style slideshow from a list of images and a voiceover MP3.
@@ -200,6 +169,9 @@ def build_slideshow_video(
       - slowly zooms in over its duration
 
     Total slideshow duration matches the voiceover duration.
+
+    With `profile=True` (or RENDER_PROFILE in the environment) a render
+    profile report is written to PROFILE_DIR alongside the video.
     """
 
     os.makedirs(OUTPUT_DIR, exist_ok=True)
@@ -207,58 +179,54 @@ def build_slideshow_video(
     if not image_paths:
         raise ValueError("build_slideshow_video requires at least one image.")
 
-    voice = AudioFileClip(voiceover_path)
-    duration = max(voice.duration, 1.0)
-    per_scene = duration / len(image_paths)
-
-    clips = []
-    for img_path in image_paths:
-        base = ImageClip(img_path).set_duration(per_scene)
-
-        # First scale to fixed height so image size is consistent
-        w, h = base.size
-        if h != target_resolution:
-            scale = float(target_resolution) / float(h)
-            base = base.resize(scale)
-
-        # Ken Burns style: slight zoom-in over the clip duration
-        # Using a factor from 1.0 to about 1.1 across the scene
-        def zoom_factor(t, total=per_scene):
-            if total <= 0:
-                return 1.0
-            return 1.0 + 0.1 * (t / total)
-
-        zoomed = base.resize(zoom_factor)
-
-        clips.append(zoomed)
-
-    # Concatenate all scenes
-    video = concatenate_videoclips(clips, method="compose")
-    video = video.set_duration(duration)
-
-    # Optional global fade-in/out to soften edges (0.5s each)
-    video = video.fx(vfx.fadein, 0.5).fx(vfx.fadeout, 0.5)
-
-    # Compose audio (voice + optional music)
-    audio = _compose_audio(voiceover_path, music_choice, duration)
-    final_clip = video.set_audio(audio)
-
-    # Set frames per second explicitly
-    final_clip = final_clip.set_fps(24)
-
-    out_path = Path(OUTPUT_DIR) / output_name
-    final_clip.write_videofile(
-        str(out_path),
-        codec="libx264",
-        audio_codec="aac",
-        fps=24,
-    )
-
-
-    # Cleanup
-    video.close()
-    voice.close()
-    for c in clips:
-        c.close()
+    with RenderProfiler(output_name, enabled=profile) as profiler:
+        voice = AudioFileClip(voiceover_path)
+        duration = max(voice.duration, 1.0)
+        per_scene = duration / len(image_paths)
+
+        clips = []
+        for img_path in image_paths:
+            base = ImageClip(img_path).set_duration(per_scene)
+
+            # First scale to fixed height so image size is consistent
+            w, h = base.size
+            if h != target_resolution:
+                scale = float(target_resolution) / float(h)
+                base = base.resize(scale)
+
+            # Ken Burns style: slight zoom-in over the clip duration
+            # Using a factor from 1.0 to about 1.1 across the scene
+            def zoom_factor(t, total=per_scene):
+                if total <= 0:
+                    return 1.0
+                return 1.0 + 0.1 * (t / total)
+
+            zoomed = base.resize(zoom_factor)
+
+            clips.append(zoomed)
+
+        # Concatenate all scenes
+        video = concatenate_videoclips(clips, method="compose")
+        video = video.set_duration(duration)
+
+        # Optional global fade-in/out to soften edges (0.5s each)
+        video = video.fx(vfx.fadein, 0.5).fx(vfx.fadeout, 0.5)
+
+        # Compose audio (voice + optional music)
+        audio = _compose_audio(voiceover_path, music_choice, duration, music_seed)
+        final_clip = video.set_audio(audio)
+
+        # Set frames per second explicitly
+        final_clip = final_clip.set_fps(ENCODER_PROFILE["fps"])
+
+        out_path = Path(OUTPUT_DIR) / output_name
+        profiler.wrap_clip(final_clip)
+        final_clip.write_videofile(str(out_path), **ENCODER_PROFILE)
+
+        # Cleanup
+        video.close()
+        voice.close()
+        for c in clips:
+            c.close()
 
     return str(out_path)
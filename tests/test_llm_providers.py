@@ -0,0 +1,139 @@
+import json
+import threading
+import time
+
+import pytest
+
+import core.llm_providers as llm_providers
+from core.llm_providers import (
+    LLMProvider,
+    LLMProviderError,
+    complete_with_failover,
+)
+from core.llm_script import parse_video_plan
+
+GOOD_PLAN = json.dumps({
+    "full_script": "Buy it now.",
+    "scenes": [{"text": "Product shot", "duration_sec": 5}],
+})
+
+
+class FakeProvider(LLMProvider):
+    """Local provider that waits `delay` seconds, then returns or raises."""
+
+    def __init__(self, name, delay=0.0, response=GOOD_PLAN, error=None):
+        super().__init__()
+        self.name = name
+        self.delay = delay
+        self.response = response
+        self.error = error
+        self.calls = 0
+        self.started_at = []
+
+    def complete(self, sys_prompt, user_prompt, timeout):
+        self.calls += 1
+        self.started_at.append(time.monotonic())
+        # Event.wait rather than time.sleep so tests can patch sleep freely
+        threading.Event().wait(self.delay)
+        if self.error:
+            raise self.error
+        return self.response
+
+
+def run(providers, **kwargs):
+    kwargs.setdefault("timeout", 2.0)
+    kwargs.setdefault("retries", 0)
+    return complete_with_failover(providers, "sys", "user", parse_video_plan, **kwargs)
+
+
+def test_returns_valid_plan():
+    plan = run([FakeProvider("ok")])
+    assert plan.full_script == "Buy it now."
+    assert plan.scenes[0].duration_sec == 5
+
+
+def test_fails_over_on_bad_json():
+    bad = FakeProvider("bad", response="{not json")
+    good = FakeProvider("good", delay=0.05)
+    plan = run([bad, good])
+    assert plan.full_script == "Buy it now."
+    assert bad.calls == 1 and good.calls == 1
+
+
+def test_fails_over_on_schema_error_and_exception():
+    missing = FakeProvider("missing", response='{"full_script": "x"}')
+    broken = FakeProvider("broken", error=RuntimeError("boom"))
+    good = FakeProvider("good")
+    assert run([missing, broken, good]).scenes
+
+
+def test_hedge_fires_after_hedge_default():
+    slow = FakeProvider("slow", delay=1.5)
+    fast = FakeProvider("fast", response=json.dumps({
+        "full_script": "fast",
+        "scenes": [{"text": "a", "duration_sec": 3}],
+    }))
+    start = time.monotonic()
+    plan = run([slow, fast], timeout=3.0, hedge=True, hedge_default=0.2)
+    elapsed = time.monotonic() - start
+
+    assert plan.full_script == "fast"
+    hedge_delay = fast.started_at[0] - slow.started_at[0]
+    assert 0.15 <= hedge_delay < 0.6
+    assert elapsed < 1.0
+
+
+def test_hedge_uses_observed_p95():
+    slow = FakeProvider("slow", delay=0.6)
+    fast = FakeProvider("fast")
+    for _ in range(10):
+        slow.record_latency(0.1)
+    run([slow, fast], timeout=3.0, hedge=True, hedge_default=5.0)
+    assert fast.calls == 1
+    assert fast.started_at[0] - slow.started_at[0] < 0.4
+
+
+def test_no_hedge_without_flag():
+    slow = FakeProvider("slow", delay=0.3)
+    other = FakeProvider("other")
+    run([slow, other], hedge=False)
+    assert other.calls == 0
+
+
+def test_deadline_raises():
+    hanging = FakeProvider("hanging", delay=5.0)
+    start = time.monotonic()
+    with pytest.raises(LLMProviderError, match="timed out"):
+        run([hanging], timeout=0.2)
+    assert time.monotonic() - start < 1.0
+
+
+def test_all_bad_raises():
+    with pytest.raises(LLMProviderError):
+        run([FakeProvider("a", response="[]"), FakeProvider("b", response="nope")])
+
+
+def test_retry_count_and_backoff(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(llm_providers.time, "sleep", sleeps.append)
+    monkeypatch.setattr(llm_providers.random, "uniform", lambda a, b: 1.0)
+
+    bad = FakeProvider("bad", response="{")
+    with pytest.raises(LLMProviderError, match="attempt 3"):
+        run([bad], retries=2, backoff=0.5)
+
+    assert bad.calls == 3
+    assert sleeps == [0.5, 1.0]
+
+
+def test_retry_recovers(monkeypatch):
+    monkeypatch.setattr(llm_providers.time, "sleep", lambda s: None)
+
+    class Flaky(FakeProvider):
+        def complete(self, *args):
+            raw = super().complete(*args)
+            return "{" if self.calls == 1 else raw
+
+    flaky = Flaky("flaky")
+    assert run([flaky], retries=1).full_script == "Buy it now."
+    assert flaky.calls == 2
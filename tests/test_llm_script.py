@@ -0,0 +1,139 @@
+import json
+
+import pytest
+
+import core.llm_providers as llm_providers
+import core.llm_script as llm_script
+from core.llm_providers import LLMProvider, LLMProviderError
+from core.llm_script import (
+    PlanStreamParser,
+    Scene,
+    parse_video_plan,
+    stream_video_plan,
+)
+
+PLAN = {
+    "full_script": 'Say "hi" {not a brace} [nor a bracket] \\ done',
+    "scenes": [
+        {"text": "a, } ] {", "duration_sec": 4, "extra": [1, {"x": "}"}]},
+        {"text": "second \"quoted\"", "duration_sec": "6"},
+    ],
+}
+
+
+def feed_in_chunks(doc: str, size: int):
+    parser = PlanStreamParser()
+    events = []
+    for i in range(0, len(doc), size):
+        events += parser.feed(doc[i:i + size])
+    return parser, events
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 10_000])
+def test_parser_events_independent_of_chunk_boundaries(size):
+    doc = json.dumps(PLAN)
+    parser, events = feed_in_chunks(doc, size)
+
+    assert events == [
+        ("full_script", PLAN["full_script"]),
+        ("scene", (1, Scene(text="a, } ] {", duration_sec=4))),
+        ("scene", (2, Scene(text='second "quoted"', duration_sec=6))),
+    ]
+    assert parser.buf == doc
+
+
+def test_parser_ignores_nested_scenes_key_and_leading_text():
+    doc = "```json\n" + json.dumps({
+        "meta": {"scenes": [{"text": "nested", "duration_sec": 1}]},
+        "full_script": "script",
+        "scenes": [{"text": "real", "duration_sec": 2}],
+    })
+    _, events = feed_in_chunks(doc, 5)
+    assert events == [
+        ("full_script", "script"),
+        ("scene", (1, Scene(text="real", duration_sec=2))),
+    ]
+
+
+def test_parser_holds_scenes_until_full_script():
+    doc = json.dumps({
+        "scenes": [
+            {"text": "one", "duration_sec": 3},
+            {"text": "two", "duration_sec": 3},
+        ],
+        "full_script": "late script",
+    })
+    _, events = feed_in_chunks(doc, 4)
+    assert [kind for kind, _ in events] == ["full_script", "scene", "scene"]
+    assert events[0][1] == "late script"
+
+
+def test_parser_keeps_array_index_when_scene_is_invalid():
+    doc = json.dumps({
+        "full_script": "s",
+        "scenes": [
+            {"text": "ok", "duration_sec": 3},
+            {"text": "no duration"},
+            {"text": "third", "duration_sec": 3},
+        ],
+    })
+    _, events = feed_in_chunks(doc, 6)
+    assert [value[0] for kind, value in events if kind == "scene"] == [1, 3]
+
+
+class StreamProvider(LLMProvider):
+    def __init__(self, name, chunks, error=None, response=None):
+        super().__init__()
+        self.name = name
+        self.chunks = chunks
+        self.error = error
+        self.response = response or json.dumps(PLAN)
+
+    def stream(self, sys_prompt, user_prompt, timeout):
+        for chunk in self.chunks:
+            yield chunk
+        if self.error:
+            raise self.error
+
+    def complete(self, sys_prompt, user_prompt, timeout):
+        return self.response
+
+
+def use_providers(monkeypatch, *providers):
+    monkeypatch.setattr(llm_script, "provider_chain", lambda name: list(providers))
+
+
+def test_stream_yields_script_scenes_then_plan(monkeypatch):
+    doc = json.dumps(PLAN)
+    use_providers(monkeypatch, StreamProvider("p", [doc[:20], doc[20:]]))
+
+    events = list(stream_video_plan("product"))
+    assert [kind for kind, _ in events] == ["full_script", "scene", "scene", "plan"]
+    assert events[-1][1] == parse_video_plan(doc)
+
+
+def test_stream_falls_back_when_final_json_invalid(monkeypatch):
+    use_providers(monkeypatch, StreamProvider("p", ['{"full_script": "x", "scenes": [']))
+
+    events = list(stream_video_plan("product"))
+    kinds = [kind for kind, _ in events]
+    assert kinds == ["full_script", "fallback", "plan"]
+    assert events[-1][1].full_script == PLAN["full_script"]
+
+
+def test_stream_falls_back_when_stream_breaks(monkeypatch):
+    provider = StreamProvider("p", ['{"full_script": "x"'], error=RuntimeError("reset"))
+    use_providers(monkeypatch, provider)
+
+    events = list(stream_video_plan("product"))
+    assert events[-2][0] == "fallback"
+    assert events[-1][1].full_script == PLAN["full_script"]
+
+
+def test_stream_raises_when_fallback_fails(monkeypatch):
+    monkeypatch.setattr(llm_providers.time, "sleep", lambda s: None)
+    provider = StreamProvider("p", ["{"], response="still not json")
+    use_providers(monkeypatch, provider)
+
+    with pytest.raises(LLMProviderError):
+        list(stream_video_plan("product"))
@@ -0,0 +1,81 @@
+import os
+from pathlib import Path
+
+import pytest
+
+import core.render_cache as render_cache
+
+ENCODER = {"codec": "libx264", "audio_codec": "aac", "fps": 24}
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    path = tmp_path / "cache"
+    monkeypatch.setattr(render_cache, "RENDER_CACHE_DIR", str(path))
+    return path
+
+
+def write(path, data: bytes) -> str:
+    path.write_bytes(data)
+    return str(path)
+
+
+def key(**overrides):
+    args = dict(
+        script="Buy now",
+        voice="alloy",
+        engine="slideshow",
+        resolution=1080,
+        encoder=ENCODER,
+    )
+    args.update(overrides)
+    return render_cache.render_key(**args)
+
+
+def test_render_key_tracks_content_not_names(tmp_path):
+    img = write(tmp_path / "upload_1.png", b"image-a")
+    song = write(tmp_path / "song.mp3", b"music-a")
+    base = key(image_paths=[img], music_path=song, music_seed=7)
+
+    assert key(image_paths=[img], music_path=song, music_seed=7) == base
+    assert key(image_paths=[img], music_path=song, music_seed=8) != base
+    assert key(image_paths=[img], music_path=song, music_seed=7, voice="nova") != base
+    assert key(image_paths=[img], music_path=song, music_seed=7, resolution=720) != base
+
+    # Same filenames, different bytes -> different key
+    write(tmp_path / "upload_1.png", b"image-b")
+    assert key(image_paths=[img], music_path=song, music_seed=7) != base
+    write(tmp_path / "upload_1.png", b"image-a")
+    write(tmp_path / "song.mp3", b"music-b")
+    assert key(image_paths=[img], music_path=song, music_seed=7) != base
+
+
+def test_lookup_store_roundtrip(cache_dir, tmp_path):
+    video = write(tmp_path / "out.mp4", b"mp4")
+    assert render_cache.lookup("k") is None
+
+    cached = render_cache.store("k", video)
+    assert render_cache.lookup("k") == cached
+    assert open(cached, "rb").read() == b"mp4"
+
+
+def test_evict_least_recently_used(cache_dir, tmp_path):
+    video = write(tmp_path / "out.mp4", b"x" * 400_000)
+
+    for i, name in enumerate(["a", "b"]):
+        path = render_cache.store(name, video)
+        os.utime(path, (1000 + i, 1000 + i))
+
+    # A hit on "a" makes "b" the least recently used entry
+    render_cache.lookup("a")
+    render_cache.store("c", video)
+    render_cache.evict(max_mb=1)
+
+    assert sorted(p.name for p in cache_dir.glob("*.mp4")) == ["a.mp4", "c.mp4"]
+
+
+def test_evict_keeps_newest_entry_even_over_budget(cache_dir, tmp_path):
+    video = write(tmp_path / "out.mp4", b"x" * 2_000_000)
+    path = render_cache.store("big", video)
+    render_cache.evict(max_mb=1, keep=Path(path))
+    assert render_cache.lookup("big") == path
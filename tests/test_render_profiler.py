@@ -0,0 +1,133 @@
+import json
+import threading
+import tracemalloc
+
+import pytest
+
+import core.render_profiler as render_profiler
+from core.render_profiler import (
+    FFMPEG_AudioReader,
+    FFMPEG_VideoReader,
+    FFMPEG_VideoWriter,
+    RenderProfiler,
+)
+
+
+class FakeProc:
+    pass
+
+
+@pytest.fixture(autouse=True)
+def fake_moviepy(tmp_path, monkeypatch):
+    """Replace the ffmpeg-backed methods so no subprocess is started."""
+    monkeypatch.setattr(render_profiler, "PROFILE_DIR", str(tmp_path / "profiles"))
+    monkeypatch.setattr(FFMPEG_VideoWriter, "write_frame", lambda self, img: None)
+
+    def reader_init(self, filename, *args, **kwargs):
+        self.proc = FakeProc()
+
+    monkeypatch.setattr(FFMPEG_VideoReader, "__init__", reader_init)
+    monkeypatch.setattr(FFMPEG_AudioReader, "__init__", reader_init)
+    return tmp_path
+
+
+class FakeClip:
+    def __init__(self):
+        self.make_frame = lambda t: [0] * 100
+
+
+def load(prof):
+    with open(prof.report_path) as f:
+        return json.load(f)
+
+
+def test_report_contents():
+    writer = object.__new__(FFMPEG_VideoWriter)
+    with RenderProfiler("promo.mp4") as prof:
+        leaked = FFMPEG_VideoReader("a.mp4")  # kept alive, never closed
+        closed = FFMPEG_AudioReader("voice.mp3")
+        closed.proc = None
+        clip = prof.wrap_clip(FakeClip())
+        for i in range(5):
+            FFMPEG_VideoWriter.write_frame(writer, clip.make_frame(i / 24))
+
+    report = load(prof)
+    assert report["status"] == "ok"
+    assert report["frames"]["summary"]["count"] == 5
+    assert report["encoder_pipe"]["summary"]["count"] == 5
+    assert sum(report["frames"]["histogram"].values()) == 5
+    assert report["readers"]["opened"] == 2
+    assert [r["filename"] for r in report["readers"]["leaked"]] == ["a.mp4"]
+    assert leaked.proc is not None
+
+
+def test_overlapping_profilers_restore_hooks():
+    original_write = FFMPEG_VideoWriter.write_frame
+    original_init = FFMPEG_VideoReader.__init__
+    was_tracing = tracemalloc.is_tracing()
+
+    a = RenderProfiler("a.mp4").__enter__()
+    b = RenderProfiler("b.mp4").__enter__()
+    a.__exit__(None, None, None)
+    assert FFMPEG_VideoWriter.write_frame is not original_write
+    b.__exit__(None, None, None)
+
+    assert a.report_path and b.report_path
+    assert FFMPEG_VideoWriter.write_frame is original_write
+    assert FFMPEG_VideoReader.__init__ is original_init
+    assert tracemalloc.is_tracing() == was_tracing
+
+
+def test_samples_attributed_to_calling_thread():
+    writer = object.__new__(FFMPEG_VideoWriter)
+    ready = threading.Event()
+    done = threading.Event()
+    other = {}
+
+    def other_render():
+        with RenderProfiler("other.mp4") as prof:
+            other["prof"] = prof
+            ready.set()
+            done.wait(5)
+
+    thread = threading.Thread(target=other_render)
+    thread.start()
+    ready.wait(5)
+    with RenderProfiler("main.mp4") as prof:
+        FFMPEG_VideoWriter.write_frame(writer, None)
+        FFMPEG_VideoReader("main.mp4")
+    done.set()
+    thread.join(5)
+
+    assert load(prof)["encoder_pipe"]["summary"]["count"] == 1
+    assert load(other["prof"])["encoder_pipe"]["summary"]["count"] == 0
+    assert load(other["prof"])["readers"]["opened"] == 0
+
+
+def test_report_failure_does_not_fail_render(tmp_path, monkeypatch, capsys):
+    blocker = tmp_path / "not_a_dir"
+    blocker.write_text("")
+    monkeypatch.setattr(render_profiler, "PROFILE_DIR", str(blocker / "profiles"))
+
+    with RenderProfiler("promo.mp4") as prof:
+        pass
+
+    assert prof.report_path is None
+    assert "[Profile] Failed to write profile report" in capsys.readouterr().out
+
+
+def test_render_exception_is_not_masked(monkeypatch):
+    with pytest.raises(ValueError, match="render broke"):
+        with RenderProfiler("promo.mp4") as prof:
+            monkeypatch.setattr(render_profiler, "_snapshot", lambda: 1 / 0)
+            raise ValueError("render broke")
+    assert prof.report_path is None
+
+
+def test_disabled_profiler_is_noop():
+    original_write = FFMPEG_VideoWriter.write_frame
+    with RenderProfiler("promo.mp4", enabled=False) as prof:
+        assert FFMPEG_VideoWriter.write_frame is original_write
+        clip = FakeClip()
+        assert prof.wrap_clip(clip) is clip
+    assert prof.report_path is None